@@ -1,3 +1,6 @@
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import os
 import sys
 
 from google.protobuf.compiler.plugin_pb2 import \
@@ -7,50 +10,103 @@ from google.protobuf.descriptor_pb2 import \
     EnumDescriptorProto, DescriptorProto, \
     FieldDescriptorProto, \
     ServiceDescriptorProto, MethodDescriptorProto
+from google.protobuf.message import DecodeError
 
 import log
 
+# Looked up once here rather than through FieldDescriptorProto for every
+# field. The plugins import these too.
+LABEL_REPEATED = FieldDescriptorProto.LABEL_REPEATED
+TYPE_MESSAGE = FieldDescriptorProto.TYPE_MESSAGE
+TYPE_ENUM = FieldDescriptorProto.TYPE_ENUM
+
+# Parameters which don't change the generated code, so cache entries can be
+# shared regardless of their values.
+_UNCACHED_PARAMETERS = frozenset(("cache_dir", "jobs"))
+
 class Generator:
     ''' A Generator loads a .proto file and generates some source code from it.
         It must be overridden to provide certain methods. '''
+
+    # Sub-classes that don't declare their own __slots__ still get a
+    # __dict__ for any extra attributes they add.
+    __slots__ = (
+        "baseName", "swift", "log", "collapseSignatures",
+        "parameters", "sharedModule",
+        "packageName", "options", "javaPackage", "kmmPackage",
+        "_typeNameCache", "_typeCase", "_memberCase", "_enumCase",
+        "_swiftMemberCase", "_convertedTypeNames", "_indents",
+        "_codeDigest",
+    )
+
+    # Built-in types, keyed by FieldDescriptorProto.Type value and by
+    # type_name. These are constant for each target language, so they're
+    # class attributes; a sub-class that isn't Kotlin replaces them with its
+    # own class attributes.
+    knownTypes: dict[int, str] = {
+        FieldDescriptorProto.TYPE_DOUBLE: "Double",
+        FieldDescriptorProto.TYPE_FLOAT: "Float",
+        FieldDescriptorProto.TYPE_INT64: "Long",
+        FieldDescriptorProto.TYPE_UINT64: "Long",
+        FieldDescriptorProto.TYPE_INT32: "Int",
+        FieldDescriptorProto.TYPE_FIXED64: "Long",
+        FieldDescriptorProto.TYPE_FIXED32: "Int",
+        FieldDescriptorProto.TYPE_BOOL: "Boolean",
+        FieldDescriptorProto.TYPE_STRING: "String",
+        FieldDescriptorProto.TYPE_BYTES: "ByteArray",
+        FieldDescriptorProto.TYPE_UINT32: "Int",
+        FieldDescriptorProto.TYPE_SFIXED32: "Int",
+        FieldDescriptorProto.TYPE_SFIXED64: "Long",
+        FieldDescriptorProto.TYPE_SINT32: "Int",
+        FieldDescriptorProto.TYPE_SINT64: "Long",
+    }
+    knownTypesByName: dict[str, str] = {
+        "double": "Double",
+        "float": "Float",
+        "int32": "Int",
+        "int64": "Long",
+        "uint32": "Int",
+        "uint64": "Long",
+        "sint32": "Int",
+        "sint64": "Long",
+        "fixed32": "Int",
+        "fixed64": "Long",
+        "sfixed32": "Int",
+        "sfixed64": "Long",
+        "bool": "Boolean",
+        "string": "String",
+        "bytes": "ByteArray"
+    }
+
     def __init__(self, baseName: str, swift = False):
         ''' baseName is the base name of the plugin eg protoc-gen-kmm-data has a
             base name of "kmm-data". '''
         self.baseName = baseName
         self.swift = swift
         self.log = log.getLogger("protoc-gen-" + baseName)
-        self.log.debug("sys.argv = %s" % str(sys.argv))
-        self.knownTypes = (
-            None,
-            "Double", "Float", "Long", "Long", "Int",
-            "Long", "Int", "Boolean", "String",
-            None, # Group
-            None, # Message
-            "ByteArray", "Int",
-            None, # Enum
-            "Int", "Long",
-            "Int", "Long"
-        )
-        self.knownTypesByName = {
-            "double": "Double",
-            "float": "Float",
-            "int32": "Int",
-            "int64": "Long",
-            "uint32": "Int",
-            "uint64": "Long",
-            "sint32": "Int",
-            "sint64": "Long",
-            "fixed32": "Int",
-            "fixed64": "Long",
-            "sfixed32": "Int",
-            "sfixed64": "Long",
-            "bool": "Boolean",
-            "string": "String",
-            "bytes": "ByteArray"
-        }
+        self.log.debug("sys.argv = %s", sys.argv)
         # Set to False in a subclass if you want function signatures to use
         # multiline formatting
         self.collapseSignatures = True
+        # Results of resolveType, keyed by (number, typeName). This is reset
+        # for each proto file by loadOptions to keep it from growing without
+        # bound over a large request.
+        self._typeNameCache: dict[tuple[int, str | None],
+                                  tuple[str, bool]] = {}
+        # The case conversions are pure functions of the name, and the same
+        # names crop up many times in a proto file, so they're cached too.
+        self._typeCase: dict[str, str] = {}
+        self._memberCase: dict[str, str] = {}
+        self._enumCase: dict[str, str] = {}
+        self._swiftMemberCase: dict[str, str] = {}
+        # Results of convertTypeName. They only depend on the name and
+        # self.swift, which is fixed at construction.
+        self._convertedTypeNames: dict[str, str] = {}
+        # Indentation strings by level, grown on demand by indent()
+        self._indents: list[str] = [""]
+        # Hash of the plugin's own source, computed by getCachePath when the
+        # cache_dir parameter is used
+        self._codeDigest: bytes | None = None
 
     def runOnStdinAndStdout(self):
         ''' This can be used as the entry point to load the
@@ -70,37 +126,155 @@ class Generator:
             CodeGeneratorResponse by calling self.processFile() for each proto
             file in req.
             It also parses the request's `parameter` field, generating a dict
-            available in self.parameters.
+            available in self.parameters. If the `jobs` parameter is greater
+            than 1 and req has more than one proto file, they're processed in
+            parallel by up to that many worker processes. A jobs value that
+            isn't an integer is ignored with a warning.
             '''
         self.loadParameters(req)
-        for f in req.proto_file:
-            self.processProtoFile(f, response)
+        jobs = self.parameters.get("jobs", "1")
+        try:
+            jobs = int(jobs)
+        except ValueError:
+            self.log.warning("Ignoring jobs=%s, which isn't an integer; "
+                             "processing the proto files serially", jobs)
+            jobs = 1
+        if jobs > 1 and len(req.proto_file) > 1:
+            self.processInParallel(req, response, jobs)
+        else:
+            for f in req.proto_file:
+                self.processProtoFile(f, response)
+
+    def processInParallel(self, req: CodeGeneratorRequest,
+                          response: CodeGeneratorResponse,
+                          jobs: int):
+        ''' Calls processProtoFile for each proto file in req in a pool of
+            worker processes, each with its own copy of this generator. The
+            files are added to response in the same order as when they're
+            processed serially. '''
+        jobs = min(jobs, len(req.proto_file))
+        with ProcessPoolExecutor(max_workers=jobs,
+                                 initializer=_initWorker,
+                                 initargs=(self,)) as executor:
+            protoFiles = (f.SerializeToString() for f in req.proto_file)
+            for files in executor.map(_processInWorker, protoFiles):
+                response.MergeFromString(files)
     
     def loadParameters(self, req: CodeGeneratorRequest):
         ''' Loads parameters from a request. '''
+        self.parameters = {}
         if len(req.parameter) > 0:
-            parameters = (p.split("=") for p in req.parameter.split(","))
-            self.parameters = { p[0]: p[1] for p in parameters }
-        else:
-            self.parameters = {}
+            # partition so that values may themselves contain "="; entries
+            # without one are ignored
+            for kv in req.parameter.split(","):
+                k, eq, v = kv.partition("=")
+                if eq:
+                    self.parameters[k] = v
         self.sharedModule = self.parameters.get("shared_module", "shared")
     
     def processProtoFile(self, protoFile: FileDescriptorProto,
                          response: CodeGeneratorResponse):
         ''' Processes each proto file, adding a new set of output files to the
             response. It first sets self.options to a dict of the options read
-            from protoFile. '''
+            from protoFile. If the cache_dir parameter is set, the output files
+            are copied from the cache when protoFile, the parameters and the
+            plugin are all unchanged since they were cached. '''
+        cachePath = self.getCachePath(protoFile)
+        if cachePath is not None and self.loadCachedFiles(cachePath, response):
+            return
+        first = len(response.file)
         self.loadOptions(protoFile)
         self.processMessagesAndEnums(protoFile, response)
         self.processServices(protoFile, response)
+        if cachePath is not None:
+            self.saveCachedFiles(cachePath, response, first)
+
+    def getCachePath(self, protoFile: FileDescriptorProto) -> str | None:
+        ''' Gets the name of the file in cache_dir which holds the output for
+            protoFile, or None if the cache_dir parameter isn't set. The name
+            is a hash of everything the output depends on: the generator
+            class, the plugin's source, the parameters and protoFile. The
+            cache_dir and jobs parameters don't affect the output, so they're
+            left out. '''
+        cacheDir = self.parameters.get("cache_dir")
+        if not cacheDir:
+            return None
+        if self._codeDigest is None:
+            code = hashlib.sha256()
+            for source in (sys.argv[0], __file__):
+                try:
+                    with open(source, "rb") as f:
+                        code.update(f.read())
+                except OSError as e:
+                    self.log.warning("Can't read %s for cache key: %s",
+                                     source, e)
+            self._codeDigest = code.digest()
+        key = hashlib.sha256(self._codeDigest)
+        key.update(type(self).__qualname__.encode())
+        parameters = sorted((k, v) for k, v in self.parameters.items()
+                            if k not in _UNCACHED_PARAMETERS)
+        key.update(repr(parameters).encode())
+        key.update(protoFile.SerializeToString(deterministic=True))
+        return os.path.join(cacheDir,
+                            f"{self.baseName}-{key.hexdigest()}.pb")
+
+    def loadCachedFiles(self, cachePath: str,
+                        response: CodeGeneratorResponse) -> bool:
+        ''' Adds the files cached in cachePath to response. Returns False if
+            there's no usable cache entry. '''
+        try:
+            with open(cachePath, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            self.log.warning("Can't read cache file %s: %s", cachePath, e)
+            return False
+        cached = CodeGeneratorResponse()
+        try:
+            cached.ParseFromString(data)
+        except DecodeError as e:
+            self.log.warning("Ignoring corrupt cache file %s: %s",
+                             cachePath, e)
+            return False
+        response.file.extend(cached.file)
+        return True
+
+    def saveCachedFiles(self, cachePath: str,
+                        response: CodeGeneratorResponse, first: int):
+        ''' Saves the files in response from index first onwards, ie the
+            ones just generated for one proto file, to cachePath. Failing to
+            write the cache isn't fatal. '''
+        cached = CodeGeneratorResponse()
+        cached.file.extend(response.file[first:])
+        tmpPath = f"{cachePath}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(cachePath), exist_ok=True)
+            with open(tmpPath, "wb") as f:
+                f.write(cached.SerializeToString())
+            # Rename into place so a concurrent run never sees half a file
+            os.replace(tmpPath, cachePath)
+        except OSError as e:
+            self.log.warning("Can't write cache file %s: %s", cachePath, e)
+            # Don't leave a partly written file behind in cache_dir
+            try:
+                os.remove(tmpPath)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self.log.warning("Can't remove %s: %s", tmpPath, e)
     
     def loadOptions(self, protoFile: FileDescriptorProto):
-        ''' Assigns self.options etc read from protoFile . '''
+        ''' Assigns self.options etc read from protoFile, and resets the
+            per-file resolveType cache. '''
+        self._typeNameCache = {}
         self.packageName = self.typeNameCase(protoFile.package)
-        lines = str(protoFile.options).strip().split("\n")
-        options = (l.split(": ") for l in lines)
-        kvs = ((i[0], i[1].replace('"', "")) for i in options)
-        self.options = dict(i for i in kvs)
+        # Read the options via reflection instead of printing them in text
+        # format and parsing that back. This also copes with a file that has
+        # no options at all.
+        self.options = {
+            fd.name: v for fd, v in protoFile.options.ListFields()
+        }
         if not self.swift:
             self.javaPackage = self.options["java_package"]
             self.kmmPackage = self.parameters.get(
@@ -117,9 +291,9 @@ class Generator:
             and include "Converter" for converter extensions. '''
         if self.swift:
             protoName = self.typeNameCase(protoName)
-            return "%s_%s.swift" % (protoName, className)
+            return f"{protoName}_{className}.swift"
         else:
-            return "%s.kt" % className
+            return f"{className}.kt"
     
     def getRole(self):
         ''' Return "Data" or "", "Converter" etc depending on which are being
@@ -140,44 +314,52 @@ class Generator:
         ''' Processes messages and enums in protoFile. In Swift there is
             one output file, in Kotlin there is one per message/enum. '''
         protoName = self.packageName
-        if self.swift:
-            content = self.getDataHeader(protoFile)
+        # These are read for every enum and message, so look them up once.
+        package = protoFile.package
+        swift = self.swift
+        role = self.getRole()
+        # The header and footer are the same for every output file from
+        # protoFile, so only build them once.
+        header = self.getDataHeader(protoFile)
+        footer = self.getDataFooter(protoFile)
+        if swift:
+            content = list(header)
         indentationLevel = 0
         for enum in protoFile.enum_type:
-            if not self.swift:
-                content = self.getDataHeader(protoFile)
+            if not swift:
+                content = list(header)
             e = self.processEnum(protoName, enum, indentationLevel)
             content.extend(e)
-            if self.swift:
+            if swift:
                 content.append("")
             else:
-                content.extend(self.getDataFooter(protoFile))
+                content.extend(footer)
                 self.addResponseFile(
-                    protoFile.package,
-                    self.convertTypeName(enum.name) + self.getRole(),
+                    package,
+                    self.convertTypeName(enum.name) + role,
                     response,
                     content
                 )
         for msg in protoFile.message_type:
-            if not self.swift:
-                content = self.getDataHeader(protoFile)
+            if not swift:
+                content = list(header)
             m = self.processMessage(protoName, msg, indentationLevel)
             content.extend(m)
-            if self.swift:
+            if swift:
                 content.append("")
             else:
-                content.extend(self.getDataFooter(protoFile))
+                content.extend(footer)
                 self.addResponseFile(
-                    protoFile.package,
-                    self.convertTypeName(msg.name) + self.getRole(),
+                    package,
+                    self.convertTypeName(msg.name) + role,
                     response,
                     content
                 )
-        if self.swift:
-            content.extend(self.getDataFooter(protoFile))
+        if swift:
+            content.extend(footer)
             self.addResponseFile(
-                protoFile.package,
-                self.getRole(),
+                package,
+                role,
                 response,
                 content
             )
@@ -186,11 +368,13 @@ class Generator:
                         response: CodeGeneratorResponse):
         ''' Processes services in protoFile. There is one service per
             output file. '''
+        package = protoFile.package
+        suffix = "Grpc" + self.getClientVariety()
         for serv in protoFile.service:
             content = self.processService(protoFile, serv)
             self.addResponseFile(
-                protoFile.package,
-                self.typeNameCase(serv.name) + "Grpc" + self.getClientVariety(),
+                package,
+                self.typeNameCase(serv.name) + suffix,
                 response,
                 content)
     
@@ -227,8 +411,8 @@ class Generator:
             Each line is indented by an additional number of spaces multiplied
             by indentationLevel. prefix is derived from the proto package name,
             followed by parent messages when nested. '''
-        raise NotImplementedError("processEnum not overridden in %s",
-                self.baseName)
+        raise NotImplementedError(
+            f"processEnum not overridden in {self.baseName}")
     
     def processMessage(self, prefix: str,
                        msg: DescriptorProto,
@@ -242,30 +426,37 @@ class Generator:
         lines = self.messageOpening(prefix, msg, name, indentationLevel)
         indentationLevel += 1
         prefix += "." + name
+        # Bind the methods used in the loops below to locals so they aren't
+        # looked up again on every iteration.
+        extend = lines.extend
+        append = lines.append
+        processEnum = self.processEnum
+        processMessage = self.processMessage
+        processField = self.processField
         for enum in msg.enum_type:
-            lines.extend(self.processEnum(prefix, enum, indentationLevel))
-            lines.append("")
+            extend(processEnum(prefix, enum, indentationLevel))
+            append("")
         for nested in msg.nested_type:
-            lines.extend(self.processMessage(prefix,
-                                             nested,
-                                             indentationLevel))
-            lines.append("")
-        for field in msg.field:
-            lines.extend(self.processField(msg, field, indentationLevel))
-        # If the last field has a trailing comma, that's optional in Kotlin
-        # but forbidden in Swift, so remove it.
-        if lines[-1].endswith(","):
-            lines[-1] = lines[-1][:-1]
+            extend(processMessage(prefix, nested, indentationLevel))
+            append("")
+        # A trailing comma after the last field is optional in Kotlin but
+        # forbidden in Swift, so tell processField which is the last field.
+        last = len(msg.field) - 1
+        for i, field in enumerate(msg.field):
+            extend(processField(msg, field, indentationLevel,
+                                trailing=(i < last)))
         indentationLevel -= 1
         lines.extend(self.messageClosing(msg, name, indentationLevel))
         return lines
     
     def processField(self, msg: DescriptorProto,
                      field: FieldDescriptorProto,
-                     indentationLevel: int) -> list[str]:
-        ''' Processes a field of a message. '''
-        raise NotImplementedError("processField not overridden in %s",
-                self.baseName)
+                     indentationLevel: int,
+                     trailing: bool) -> list[str]:
+        ''' Processes a field of a message. trailing is False for the last
+            field, so that a separator (eg a comma) can be left off. '''
+        raise NotImplementedError(
+            f"processField not overridden in {self.baseName}")
     
     def processService(self, protoFile: FileDescriptorProto,
                        serv: ServiceDescriptorProto) -> list[str]:
@@ -283,12 +474,9 @@ class Generator:
         ''' Gets the start of a service definition eg a class. '''
         lines = self.getServiceImports(protoFile, serv)
         servName = self.getServiceName(protoFile, serv)
-        lines.append("%s %sGrpc%s %s" % (
-            self.getServiceEntity(),
-            servName,
-            self.getClientVariety(),
-            self.getServiceOpenBracket(),
-        ))
+        lines.append(f"{self.getServiceEntity()} {servName}"
+                     f"Grpc{self.getClientVariety()} "
+                     f"{self.getServiceOpenBracket()}")
         return lines
     
     def getServiceEntity(self):
@@ -301,8 +489,7 @@ class Generator:
             package in Swift. '''
         serviceName = self.typeNameCase(serv.name)
         if self.swift:
-            packageName = self.typeNameCase(protoFile.package)
-            return packageName + "_" + serviceName
+            return self.packageName + "_" + serviceName
         else:
             return serviceName
 
@@ -338,21 +525,17 @@ class Generator:
         if method.client_streaming and withCallbacks:
             arg = self.getResultCallback(protoFile, method)
             arg = ["    " + l for l in arg]
-            ret = [")%s%s" % (
-                self.getReturnSymbol(),
-                self.getStreamerInterfaceName(protoFile, serv, inputType)
-            )]
+            streamer = self.getStreamerInterfaceName(protoFile, serv,
+                                                     inputType)
+            ret = [f"){self.getReturnSymbol()}{streamer}"]
         else:
             if method.client_streaming:
                 inputType = self.convertClientStreamingInput(inputType)
             ret = self.getReturn(protoFile, method)
-            arg = ["    request: %s%s" % (inputType, ret[0])]
+            arg = [f"    request: {inputType}{ret[0]}"]
             ret = ret[1:]
-        lines = ["%s%s%s(" % (suspend,
-                              self.getFuncKeyword(),
-                              self.memberCase(method.name)
-                              ),
-        ]
+        funcName = self.memberCase(method.name)
+        lines = [f"{suspend}{self.getFuncKeyword()}{funcName}("]
         lines.extend(arg)
         lines.extend(ret)
         if self.collapseSignatures:
@@ -371,7 +554,7 @@ class Generator:
     def convertClientStreamingInput(self, typeName: str) -> str:
         ''' Converts the type of a request input to a client streaming version.
             N/A in swift. '''
-        return "Flow<%s>" % typeName
+        return f"Flow<{typeName}>"
     
     def getReturn(self, protoFile: FileDescriptorProto,
                   method: MethodDescriptorProto) -> list[str]:
@@ -386,7 +569,7 @@ class Generator:
             return self.getResultCallbackInLieuOfReturn(protoFile, method)
         typeName = self.convertTypeName(method.output_type)
         if method.server_streaming:
-            typeName = "Flow<%s>" % typeName
+            typeName = f"Flow<{typeName}>"
         return [ "", ")" + self.getReturnSymbol() + typeName]
     
     def getResultCallbackInLieuOfReturn(self, protoFile: FileDescriptorProto,
@@ -407,9 +590,8 @@ class Generator:
         if not typeName.endswith("?"):
             typeName += "?"
         escaping = "@escaping " if self.swift else ""
-        return ["result: %s(%s, String?)%s" % \
-                (escaping, typeName, self.getReturnVoid())
-        ]
+        returnVoid = self.getReturnVoid()
+        return [f"result: {escaping}({typeName}, String?){returnVoid}"]
     
     def getFuncKeyword(self) -> str:
         ''' Gets the keyword for a function in the target language, including
@@ -432,72 +614,80 @@ class Generator:
         ''' This is only useful for Kotlin, Swift should return "". '''
         return "" if self.swift else "suspend "
     
+    def resolveType(self, number: int,
+                    typeName: str | None) -> tuple[str, bool]:
+        ''' Gets the typename in the target language (here, Kotlin) and
+            whether it's built-in/primitive, in one pass. Results are cached
+            in self._typeNameCache. '''
+        key = (number, typeName)
+        cached = self._typeNameCache.get(key)
+        if cached is not None:
+            return cached
+        if number == TYPE_MESSAGE:
+            result = (self.convertTypeName(typeName) + "?", False)
+        elif number == TYPE_ENUM:
+            result = (self.convertTypeName(typeName), False)
+        else:
+            n = None
+            if number != 0:
+                n = self.getBuiltInTypeByNumber(number)
+            if n is None:
+                if typeName is None:
+                    # This would be Any?, so it shouldn't be converted
+                    n = "Any?"
+                else:
+                    n = self.getBuiltInTypeByName(typeName)
+            if n is not None:
+                result = (n, True)
+            else:
+                result = (self.convertTypeName(typeName) + "?", False)
+        self._typeNameCache[key] = result
+        return result
+
     def getTypeName(self, number: int, typeName: str | None) -> str:
         ''' Gets the typename in the target language (here, Kotlin). '''
-        if number == FieldDescriptorProto.TYPE_MESSAGE:
-            return self.convertTypeName(typeName) + "?"
-        elif number == FieldDescriptorProto.TYPE_ENUM:
-            return self.convertTypeName(typeName)
-        elif number != 0:
-            n = self.getBuiltInTypeByNumber(number)
-            if n is not None:
-                return n
-        if typeName is None:
-            return "Any?"
-        n = self.getBuiltInTypeByName(typeName)
-        if n is not None:
-            return n
-        return self.convertTypeName(typeName) + "?"
+        return self.resolveType(number, typeName)[0]
     
     def typeIsBuiltIn(self, number: int, typeName: str | None) -> bool:
         ''' Works out whether the type of a field is built-in/primitive. '''
-        if number == FieldDescriptorProto.TYPE_MESSAGE:
-            return False
-        elif number == FieldDescriptorProto.TYPE_ENUM:
-            return False
-        elif number != 0:
-            n = self.getBuiltInTypeByNumber(number)
-            if n is not None:
-                return True
-        if typeName is None:
-            # This would be Any?, so it shouldn't be converted
-            return True
-        n = self.getBuiltInTypeByName(typeName)
-        if n is not None:
-            return True
-        return False
+        return self.resolveType(number, typeName)[1]
     
     def convertTypeName(self, name: str) -> str:
         ''' Strips any leading qualifier (includes aren't currently supported),
-            applies self.typeNameCase. '''
+            applies self.typeNameCase. Results are cached in
+            self._convertedTypeNames. '''
+        converted = self._convertedTypeNames.get(name)
+        if converted is not None:
+            return converted
+        key = name
         if name.startswith("."):
-            name = name.split(".")
+            # Drop the leading ".package." in one scan instead of splitting
+            # the whole name into a list and joining it back together.
+            name = name[1:].partition(".")[2]
             if self.swift:
                 # @ObjCName is a fabrication, so Swift/ObjC names have to be
                 # the same as Kotlin.
-                name = "".join(name[2:])
+                name = name.replace(".", "")
                 '''
                 prefix = name[1]
                 name = "".join(name[2:])
                 return self.typeNameCase(prefix) + self.typeNameCase(name)
                 '''
-            else:
-                name = ".".join(name[2:])
-        return self.typeNameCase(name)
+        converted = self.typeNameCase(name)
+        self._convertedTypeNames[key] = converted
+        return converted
 
     def getBuiltInTypeByNumber(self, number: int) -> str | None:
         ''' Looks up a built-in type by its FieldDescriptorProto.Type value,
-            using self.knownTypes, which can be replaced in a sub-class'
-            constructor if not Kotlin. '''
-        if number >= len(self.knownTypes):
-            return None
-        return self.knownTypes[number]
+            using self.knownTypes, which can be replaced by a sub-class'
+            class attribute if not Kotlin. '''
+        return self.knownTypes.get(number)
     
     def getBuiltInTypeByName(self, name: str) -> str | None:
         ''' Looks up a built-in type by its FieldDescriptorProto.type_name,
-            using self.knownTypesByName, which can be replaced in a sub-class'
-            constructor if not Kotlin. '''
-        return self.knownTypesByName(name)
+            using self.knownTypesByName, which can be replaced by a sub-class'
+            class attribute if not Kotlin. '''
+        return self.knownTypesByName.get(name)
     
     def messageOpening(self, prefix: str,
                        msg: DescriptorProto,
@@ -505,40 +695,67 @@ class Generator:
                        indentationLevel: int) -> list[str]:
         ''' Returns the opening line(s) of a class etc representing a protobuf
             message. '''
-        raise NotImplementedError("messageOpening not overridden in %s",
-                self.baseName)
+        raise NotImplementedError(
+            f"messageOpening not overridden in {self.baseName}")
 
     def messageClosing(self, msg: DescriptorProto,
                        name: str,
                        indentationLevel: int) -> list[str]:
         ''' Returns the closing line(s) of a class etc representing a protobuf,
             eg ')' for a Kotlin data class. '''
-        raise NotImplementedError("messageClosing not overridden in %s",
-                self.baseName)
+        raise NotImplementedError(
+            f"messageClosing not overridden in {self.baseName}")
+
+    def indent(self, level: int) -> str:
+        ''' Returns the indentation for level, ie 4 spaces per level. The
+            strings are cached so that each level is only built once. '''
+        indents = self._indents
+        while len(indents) <= level:
+            indents.append(indents[-1] + "    ")
+        return indents[level]
 
     def typeNameCase(self, name: str) -> str:
         ''' Converts the case of a name to the appropriate convention for a type
             name, here "foo_bar" -> "FooBar". '''
-        if "_" not in name:
-            return name[0].upper() + name[1:]
-        elements = name.split("_")
-        elements = list(e.capitalize() for e in elements)
-        return "".join(elements)
+        converted = self._typeCase.get(name)
+        if converted is None:
+            if "_" not in name:
+                if "A" <= name[0] <= "Z":
+                    converted = name
+                else:
+                    converted = name[0].upper() + name[1:]
+            else:
+                converted = "".join(map(str.capitalize, name.split("_")))
+            self._typeCase[name] = converted
+        return converted
 
     def enumCase(self, name: str) -> str:
         ''' Converts the case of a name to the appropriate convention for an
             enum member name, here "foo_bar" -> "FOO_BAR". '''
-        return name.upper()
+        converted = self._enumCase.get(name)
+        if converted is None:
+            converted = name.upper()
+            self._enumCase[name] = converted
+        return converted
 
     def memberCase(self, name: str) -> str:
         ''' Converts the case of a name to the appropriate convention for a
             method or message field, here camelCase ("foo_bar" -> "fooBar"). '''
-        if "_" not in name:
-            return name[0].lower() + name[1:]
-        elements = name.split("_")
-        elements = list(e.capitalize() for e in elements)
-        elements[0] = elements[0][0].lower() + elements[0][1:]
-        return "".join(elements)
+        converted = self._memberCase.get(name)
+        if converted is None:
+            if "_" not in name:
+                if "a" <= name[0] <= "z":
+                    converted = name
+                else:
+                    converted = name[0].lower() + name[1:]
+            else:
+                # Capitalizing the first element and then lowering its first
+                # letter is the same as lowering all of it.
+                head, _, tail = name.partition("_")
+                converted = head.lower() + \
+                    "".join(map(str.capitalize, tail.split("_")))
+            self._memberCase[name] = converted
+        return converted
 
     def swiftMemberCase(self, name: str) -> str:
         ''' Like memberCase but deals with a quirk in the upstream Swift
@@ -547,6 +764,10 @@ class Generator:
             whether there are any similar quirks that can be dealt with by
             pattern matching. Nor what should happen to "id_foo_bar". Please
             report any issues, PRs welcome. '''
+        converted = self._swiftMemberCase.get(name)
+        if converted is not None:
+            return converted
+        key = name
         if "_" not in name:
             name = name[0].lower() + name[1:]
             if name.endswith("Id"):
@@ -556,7 +777,9 @@ class Generator:
         elements[0] = elements[0][0].lower() + elements[0][1:]
         elements = [elements[0]] + ["ID" if e == "Id" else e \
                                     for e in elements[1:]]
-        return "".join(elements)
+        converted = "".join(elements)
+        self._swiftMemberCase[key] = converted
+        return converted
 
     def getStreamerInterfaceName(self, protoFile: FileDescriptorProto,
                                  serv: ServiceDescriptorProto,
@@ -568,7 +791,7 @@ class Generator:
         if self.swift:
             return "GrpcIosClientHelperClientStreamer"
         else:
-            return "GrpcIosClientHelper.ClientStreamer<%s>" % typeName
+            return f"GrpcIosClientHelper.ClientStreamer<{typeName}>"
     
     def getClientVariety(self):
         ''' "AndroidClient", "IosDelegate" etc. '''
@@ -577,4 +800,21 @@ class Generator:
     def getServiceOpenBracket(self):
         ''' "(" or "{" depending on whether the class has constructor
             parameters.'''
-        return "{"
\ No newline at end of file
+        return "{"
+
+
+# The generator used by a worker process started by
+# Generator.processInParallel
+_workerGenerator: Generator | None = None
+
+def _initWorker(generator: Generator):
+    global _workerGenerator
+    _workerGenerator = generator
+
+def _processInWorker(protoFile: bytes) -> bytes:
+    ''' Processes a serialized FileDescriptorProto in a worker process,
+        returning the output files as a serialized CodeGeneratorResponse. '''
+    response = CodeGeneratorResponse()
+    protoFile = FileDescriptorProto.FromString(protoFile)
+    _workerGenerator.processProtoFile(protoFile, response)
+    return response.SerializeToString()
@@ -1,9 +1,12 @@
 import logging
 
-def getLogger(name: str) -> logging.Logger:
-    logger = logging.getLogger(name)
+# Configure the root logger once, when this module is first imported,
+# rather than every time a logger is requested.
+if not logging.getLogger().handlers:
     logging.basicConfig(
         level = logging.INFO,
             format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     )
-    return logger
+
+def getLogger(name: str) -> logging.Logger:
+    return logging.getLogger(name)